@@ -0,0 +1,122 @@
+import os
+from datetime import datetime, timedelta
+from typing import List
+from sqlalchemy import func, literal, select, text, union_all
+from sqlalchemy.orm import Session, selectinload
+from database import SessionLocal, engine
+from models import WorkOrder, UsedPart, ArchivedWorkOrder, ArchivedUsedPart, WorkOrderStatus
+
+# FIXED work orders older than this are moved to the archive tables
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+# Work orders moved per transaction, so the live tables are never locked for long
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+
+WORK_ORDER_COLUMNS = ["id", "bus_id", "date", "reported_by", "severity", "description", "status", "is_pm", "fixed_at"]
+USED_PART_COLUMNS = ["id", "inventory_id", "work_order_id", "quantity_used"]
+
+def upgrade_schema(bind):
+    # create_all doesn't alter existing tables: add fixed_at (archive cutoff) and the
+    # bus_id/status indexes the live listings rely on. Names match what create_all uses.
+    with bind.begin() as conn:
+        columns = [row[1] for row in conn.exec_driver_sql("PRAGMA table_info(work_orders)")]
+        if not columns:
+            return
+        if "fixed_at" not in columns:
+            conn.exec_driver_sql("ALTER TABLE work_orders ADD COLUMN fixed_at DATETIME")
+        conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_work_orders_bus_id ON work_orders (bus_id)")
+        conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_work_orders_status ON work_orders (status)")
+
+def has_autoincrement(db: Session, table: str) -> bool:
+    sql = db.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table}
+    ).scalar()
+    return sql is not None and "AUTOINCREMENT" in sql.upper()
+
+def archive_fixed_work_orders(
+    db: Session,
+    older_than_days: int = ARCHIVE_AFTER_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+) -> int:
+    # Without AUTOINCREMENT SQLite reuses the highest freed id, which would
+    # collide with archived primary keys. Tables created before archiving need a re-seed.
+    for table in ("work_orders", "used_parts"):
+        if not has_autoincrement(db, table):
+            raise RuntimeError(f"{table} was created without AUTOINCREMENT; re-seed the database before archiving")
+
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    total = 0
+    while True:
+        # Work orders fixed before fixed_at existed fall back to their report date
+        batch = (
+            db.query(WorkOrder)
+            .options(selectinload(WorkOrder.used_parts))
+            .filter(WorkOrder.status == WorkOrderStatus.FIXED)
+            .filter(func.coalesce(WorkOrder.fixed_at, WorkOrder.date) < cutoff)
+            .order_by(WorkOrder.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+
+        archived_at = datetime.utcnow()
+        for wo in batch:
+            db.add(ArchivedWorkOrder(archived_at=archived_at, **{c: getattr(wo, c) for c in WORK_ORDER_COLUMNS}))
+            for part in wo.used_parts:
+                db.add(ArchivedUsedPart(**{c: getattr(part, c) for c in USED_PART_COLUMNS}))
+                db.delete(part)
+            db.delete(wo)
+        db.commit()
+        total += len(batch)
+    return total
+
+def work_order_history(db: Session, bus_id: str, skip: int = 0, limit: int = 100) -> List[dict]:
+    # Live and archived work orders for one bus, newest first, with used parts inline
+    live = select(*[getattr(WorkOrder, c) for c in WORK_ORDER_COLUMNS], literal(False).label("archived")).where(
+        WorkOrder.bus_id == bus_id
+    )
+    archived = select(*[getattr(ArchivedWorkOrder, c) for c in WORK_ORDER_COLUMNS], literal(True).label("archived")).where(
+        ArchivedWorkOrder.bus_id == bus_id
+    )
+    history = union_all(live, archived).subquery()
+    rows = db.execute(
+        select(history).order_by(history.c.date.desc(), history.c.id.desc()).offset(skip).limit(limit)
+    ).all()
+
+    live_ids = [row.id for row in rows if not row.archived]
+    archived_ids = [row.id for row in rows if row.archived]
+    parts = {}
+    if live_ids:
+        for part in db.query(UsedPart).filter(UsedPart.work_order_id.in_(live_ids)):
+            parts.setdefault((False, part.work_order_id), []).append(part)
+    if archived_ids:
+        for part in db.query(ArchivedUsedPart).filter(ArchivedUsedPart.work_order_id.in_(archived_ids)):
+            parts.setdefault((True, part.work_order_id), []).append(part)
+
+    return [
+        {
+            **{c: getattr(row, c) for c in WORK_ORDER_COLUMNS},
+            "archived": bool(row.archived),
+            "used_parts": [
+                {c: getattr(part, c) for c in USED_PART_COLUMNS}
+                for part in parts.get((bool(row.archived), row.id), [])
+            ],
+        }
+        for row in rows
+    ]
+
+def used_parts_history(db: Session, wo_id: int) -> List:
+    # A work order's parts are either all live or all archived
+    parts = db.query(UsedPart).filter(UsedPart.work_order_id == wo_id).all()
+    if parts:
+        return parts
+    return db.query(ArchivedUsedPart).filter(ArchivedUsedPart.work_order_id == wo_id).all()
+
+if __name__ == "__main__":
+    upgrade_schema(engine)
+    db = SessionLocal()
+    try:
+        moved = archive_fixed_work_orders(db)
+        print(f"Archived {moved} fixed work orders older than {ARCHIVE_AFTER_DAYS} days")
+    finally:
+        db.close()
@@ -0,0 +1,81 @@
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Literal, Optional, Sequence
+
+# Media type clients send in the Accept header (or ?format=columnar) to get
+# one array per field instead of one object per row.
+COLUMNAR_MEDIA_TYPE = "application/vnd.fleet.columnar+json"
+
+# Values accepted by the ?format= query parameter; anything else is a 422
+ResponseFormat = Literal["json", "columnar"]
+
+def _accept_quality(accept: str, media_types: Sequence[str]) -> float:
+    # Highest q among the Accept media ranges matching any of `media_types`
+    best = 0.0
+    for media_range in accept.split(","):
+        media_type, *params = [p.strip() for p in media_range.split(";")]
+        if media_type.lower() not in media_types:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        best = max(best, q)
+    return best
+
+def wants_columnar(request: Request, response_format: Optional[ResponseFormat] = None) -> bool:
+    if response_format is not None:
+        return response_format == "columnar"
+    accept = request.headers.get("accept")
+    if not accept:
+        return False
+    columnar_q = _accept_quality(accept, [COLUMNAR_MEDIA_TYPE])
+    json_q = _accept_quality(accept, ["application/json", "application/*", "*/*"])
+    return columnar_q > 0 and columnar_q >= json_q
+
+def _plain(value: Any) -> Any:
+    # Enums are stored as their string value, datetimes as ISO strings
+    value = getattr(value, "value", value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def encode_columnar(
+    rows: Iterable[Dict[str, Any]],
+    fields: Sequence[str],
+    dictionaries: Optional[Dict[str, List[str]]] = None,
+) -> Dict[str, Any]:
+    # Fields listed in `dictionaries` are sent as indexes into that list.
+    # Null stays null so optional enums (e.g. PM severity) round-trip.
+    dictionaries = dictionaries or {}
+    lookups = {f: {v: i for i, v in enumerate(values)} for f, values in dictionaries.items()}
+    columns: Dict[str, List[Any]] = {f: [] for f in fields}
+    count = 0
+    for row in rows:
+        count += 1
+        for f in fields:
+            value = _plain(row[f])
+            if f in lookups and value is not None:
+                value = lookups[f][value]
+            columns[f].append(value)
+    return {
+        "count": count,
+        "columns": columns,
+        "dictionaries": {f: dictionaries[f] for f in fields if f in dictionaries},
+    }
+
+def columnar_response(
+    rows: Iterable[Dict[str, Any]],
+    fields: Sequence[str],
+    dictionaries: Optional[Dict[str, List[str]]] = None,
+) -> JSONResponse:
+    return JSONResponse(
+        encode_columnar(rows, fields, dictionaries),
+        media_type=COLUMNAR_MEDIA_TYPE,
+        headers={"Vary": "Accept"},
+    )
@@ -1,13 +1,17 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.orm import Session, joinedload
 from datetime import timedelta, datetime
-import models, schemas, database
+import models, schemas, database, archive, profiling
+from columnar import ResponseFormat, wants_columnar, columnar_response
 from database import SessionLocal, engine
 from typing import List, Optional
 
 models.Base.metadata.create_all(bind=engine)
+archive.upgrade_schema(engine)
 
 app = FastAPI()
 
@@ -18,8 +22,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Profile-Id"],
 )
 
+# Compress large bodies (fleet listings); small responses aren't worth the CPU
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 def get_db():
@@ -36,6 +44,18 @@ def verify_password(plain_password, stored_password):
 def get_user(db, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
+def is_profiling_admin(token: str) -> bool:
+    # Same token -> user lookup as get_current_user; called from the threadpool
+    db = SessionLocal()
+    try:
+        user = get_user(db, token)
+        return user is not None and user.role == models.Role.OPERATION_MANAGER
+    finally:
+        db.close()
+
+# Opt-in per-request profiling (X-Profile header) and slow-query log (SLOW_QUERY_MS)
+profiling.install(app, engine, is_profiling_admin)
+
 async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     # In a real app, decode token. For MVP, we'll just lookup user by "token" if we implemented simple token.
     # But let's use a dummy implementation where token is just the email for simplicity? 
@@ -70,6 +90,15 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 async def read_users_me(current_user: models.User = Depends(get_current_user)):
     return current_user
 
+@app.get("/admin/profiles/{profile_id}", response_class=PlainTextResponse)
+def read_profile(profile_id: str, current_user: models.User = Depends(get_current_user)):
+    if current_user.role != models.Role.OPERATION_MANAGER:
+        raise HTTPException(status_code=403, detail="Only Operation Managers can view profiles")
+    report = profiling.read_profile(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return report
+
 # Logic to determine status
 def calculate_bus_status(bus: models.Bus) -> str:
     # Check open WOs
@@ -80,7 +109,7 @@ def calculate_bus_status(bus: models.Bus) -> str:
 
     # If there are no open work orders with a severity, the bus is Ready
     if not open_wos_with_sev:
-        return "Ready"
+        return models.BusStatus.READY.value
 
     # Normalize severity values to their string value to be robust against Enum vs string
     def sev_value(wo):
@@ -89,19 +118,32 @@ def calculate_bus_status(bus: models.Bus) -> str:
 
     # If any SEV1 exists, it's Critical
     if any(sev_value(wo) == models.Severity.SEV1.value for wo in open_wos_with_sev):
-        return "Critical"
+        return models.BusStatus.CRITICAL.value
 
     # Otherwise there are SEV2/SEV3 open work orders
-    return "Needs Maintenance"
+    return models.BusStatus.NEEDS_MAINTENANCE.value
+
+BUS_FIELDS = ["id", "model", "location", "mileage", "last_service_mileage", "due_for_pm", "status"]
+WORK_ORDER_FIELDS = ["id", "bus_id", "date", "reported_by", "severity", "description", "status", "is_pm"]
+
+def enum_values(enum_cls) -> List[str]:
+    return [e.value for e in enum_cls]
+
+def open_work_orders():
+    # Status only depends on open work orders; don't load fixed history for listings
+    return joinedload(models.Bus.work_orders.and_(models.WorkOrder.status == models.WorkOrderStatus.OPEN))
 
 @app.get("/buses")
 def read_buses(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: Optional[int] = None,
     garage: models.Garage = None, # Filter by garage
+    response_format: Optional[ResponseFormat] = Query(None, alias="format"), # otherwise negotiated via Accept
     db: Session = Depends(get_db)
 ):
-    query = db.query(models.Bus).options(joinedload(models.Bus.work_orders))
+    query = db.query(models.Bus).options(open_work_orders())
     if garage:
          # Filter logic: Maintenance user only sees their garage usually, but this is a general filter
          # Bus location might be "North Garage", "South Garage".
@@ -127,12 +169,19 @@ def read_buses(
             "due_for_pm": bus.due_for_pm,
             "status": calculate_bus_status(bus)
         })
-    
+
+    if wants_columnar(request, response_format):
+        return columnar_response(result, BUS_FIELDS, {
+            "location": enum_values(models.BusLocation),
+            "status": enum_values(models.BusStatus),
+        })
+    # Representation depends on Accept, so caches must key on it for JSON too
+    response.headers["Vary"] = "Accept"
     return result
 
 @app.get("/buses/{bus_id}")
 def read_bus(bus_id: str, db: Session = Depends(get_db)):
-    bus = db.query(models.Bus).options(joinedload(models.Bus.work_orders)).filter(models.Bus.id == bus_id).first()
+    bus = db.query(models.Bus).options(open_work_orders()).filter(models.Bus.id == bus_id).first()
     if not bus:
         raise HTTPException(status_code=404, detail="Bus not found")
     return {
@@ -145,6 +194,11 @@ def read_bus(bus_id: str, db: Session = Depends(get_db)):
         "status": calculate_bus_status(bus)
     }
 
+@app.get("/buses/{bus_id}/work-orders", response_model=List[schemas.WorkOrderHistory])
+def read_bus_work_orders(bus_id: str, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    # History view: includes work orders moved to the archive tables
+    return archive.work_order_history(db, bus_id, skip=skip, limit=limit)
+
 @app.put("/buses/{bus_id}/mileage")
 def update_mileage(bus_id: str, mileage: int, db: Session = Depends(get_db)):
     bus = db.query(models.Bus).filter(models.Bus.id == bus_id).first()
@@ -171,8 +225,22 @@ def update_mileage(bus_id: str, mileage: int, db: Session = Depends(get_db)):
     return {"status": "updated"}
 
 @app.get("/work-orders", response_model=List[schemas.WorkOrder])
-def read_work_orders(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_work_orders(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    response_format: Optional[ResponseFormat] = Query(None, alias="format"), # otherwise negotiated via Accept
+    db: Session = Depends(get_db)
+):
     wos = db.query(models.WorkOrder).offset(skip).limit(limit).all()
+    if wants_columnar(request, response_format):
+        rows = ({f: getattr(wo, f) for f in WORK_ORDER_FIELDS} for wo in wos)
+        return columnar_response(rows, WORK_ORDER_FIELDS, {
+            "severity": enum_values(models.Severity),
+            "status": enum_values(models.WorkOrderStatus),
+        })
+    response.headers["Vary"] = "Accept"
     return wos
 
 @app.post("/work-orders", response_model=schemas.WorkOrder)
@@ -194,6 +262,7 @@ def fix_work_order(wo_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="WorkOrder not found")
     
     wo.status = models.WorkOrderStatus.FIXED
+    wo.fixed_at = datetime.utcnow()
     
     # PM Resolution Logic
     if wo.is_pm:
@@ -225,8 +294,7 @@ def read_inventory(garage: models.Garage = None, current_user: models.User = Dep
 
 @app.get("/work-orders/{wo_id}/used-parts", response_model=List[schemas.UsedPart])
 def list_used_parts(wo_id: int, db: Session = Depends(get_db)):
-    parts = db.query(models.UsedPart).filter(models.UsedPart.work_order_id == wo_id).all()
-    return parts
+    return archive.used_parts_history(db, wo_id)
 
 @app.post("/work-orders/{wo_id}/used-parts", response_model=schemas.UsedPart)
 def add_used_part(
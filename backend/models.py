@@ -17,6 +17,12 @@ class BusLocation(str, enum.Enum):
     SOUTH_GARAGE = "South Garage"
     ON_SERVICE = "On Service"
 
+class BusStatus(str, enum.Enum):
+    # Computed by main.calculate_bus_status, never stored
+    READY = "Ready"
+    NEEDS_MAINTENANCE = "Needs Maintenance"
+    CRITICAL = "Critical"
+
 class Severity(str, enum.Enum):
     SEV1 = "SEV1"
     SEV2 = "SEV2"
@@ -55,14 +61,17 @@ class Bus(Base):
 
 class WorkOrder(Base):
     __tablename__ = "work_orders"
+    # AUTOINCREMENT so ids of archived rows are never reused by new work orders
+    __table_args__ = {"sqlite_autoincrement": True}
     id = Column(Integer, primary_key=True, index=True)
-    bus_id = Column(String, ForeignKey("buses.id"))
+    bus_id = Column(String, ForeignKey("buses.id"), index=True)
     date = Column(DateTime, default=datetime.utcnow)
     reported_by = Column(String)
     severity = Column(Enum(Severity), nullable=True) # Null if PM
     description = Column(String)
-    status = Column(Enum(WorkOrderStatus), default=WorkOrderStatus.OPEN)
+    status = Column(Enum(WorkOrderStatus), default=WorkOrderStatus.OPEN, index=True)
     is_pm = Column(Boolean, default=False)
+    fixed_at = Column(DateTime, nullable=True)
 
     bus = relationship("Bus", back_populates="work_orders")
     used_parts = relationship("UsedPart", back_populates="work_order")
@@ -77,6 +86,7 @@ class Inventory(Base):
 
 class UsedPart(Base):
     __tablename__ = "used_parts"
+    __table_args__ = {"sqlite_autoincrement": True}
     id = Column(Integer, primary_key=True, index=True)
     inventory_id = Column(Integer, ForeignKey("inventory.id"))
     work_order_id = Column(Integer, ForeignKey("work_orders.id"))
@@ -84,3 +94,25 @@ class UsedPart(Base):
 
     work_order = relationship("WorkOrder", back_populates="used_parts")
     inventory = relationship("Inventory")
+
+# Cold storage for FIXED work orders moved out by archive.py.
+# Rows keep their original ids so history and used-part lookups still match.
+class ArchivedWorkOrder(Base):
+    __tablename__ = "work_orders_archive"
+    id = Column(Integer, primary_key=True, index=True)
+    bus_id = Column(String, index=True)
+    date = Column(DateTime)
+    reported_by = Column(String)
+    severity = Column(Enum(Severity), nullable=True)
+    description = Column(String)
+    status = Column(Enum(WorkOrderStatus))
+    is_pm = Column(Boolean, default=False)
+    fixed_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+class ArchivedUsedPart(Base):
+    __tablename__ = "used_parts_archive"
+    id = Column(Integer, primary_key=True, index=True)
+    inventory_id = Column(Integer, ForeignKey("inventory.id"))
+    work_order_id = Column(Integer, ForeignKey("work_orders_archive.id"), index=True)
+    quantity_used = Column(Integer)
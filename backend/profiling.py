@@ -0,0 +1,310 @@
+import asyncio
+import functools
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from typing import Callable, Optional
+from urllib.parse import parse_qs
+from fastapi.routing import APIRoute
+from fastapi.security.utils import get_authorization_scheme_param
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+
+logger = logging.getLogger("fleet.profiling")
+slow_query_logger = logging.getLogger("fleet.slow_query")
+
+# Per-request profiles are written here and served by /admin/profiles/{id}
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "100"))
+# The sampler competes for the GIL (5 ms switch interval), so finer is not more accurate
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+# Slow-query log is only installed when this is set
+SLOW_QUERY_MS = os.getenv("SLOW_QUERY_MS")
+
+THIS_FILE = os.path.abspath(__file__)
+APP_DIR = os.path.dirname(THIS_FILE) + os.sep
+PROFILE_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+_current_scope: ContextVar[Optional[dict]] = ContextVar("current_scope", default=None)
+
+
+# --- Per-request sampling profiler -------------------------------------------------
+
+class ProfileSession:
+    # Where the profiled request is running: its task on the event loop (async
+    # dependencies such as get_current_user) and the threadpool workers running
+    # its sync endpoint, registered by ProfiledRoute.
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        self.loop_thread = threading.get_ident()
+        self.worker_threads = set()
+
+    def frames(self):
+        frames = sys._current_frames()
+        for tid in tuple(self.worker_threads):
+            if tid in frames:
+                yield frames[tid]
+        if asyncio.current_task(self.loop) is self.task and self.loop_thread in frames:
+            yield frames[self.loop_thread]
+
+WAITING = "<waiting for event loop / threadpool>"
+
+_active_profile: ContextVar[Optional[ProfileSession]] = ContextVar("active_profile", default=None)
+
+
+def _is_app_code(filename: str) -> bool:
+    # Skip this module (middleware and route wrappers) and anything installed under backend/
+    return (
+        filename.startswith(APP_DIR)
+        and filename != THIS_FILE
+        and "site-packages" not in filename
+        and "dist-packages" not in filename
+    )
+
+
+class StackSampler(threading.Thread):
+    # Samples only the threads working on one request (see ProfileSession), so
+    # concurrent requests on the same instance don't show up in its report.
+    def __init__(self, session: ProfileSession, interval: float):
+        super().__init__(daemon=True)
+        self.session = session
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.total = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            sampled = False
+            for frame in self.session.frames():
+                self.samples[self._app_stack(frame)] += 1
+                self.total += 1
+                sampled = True
+            if not sampled:
+                # Queued for the event loop or a threadpool worker, e.g. under load
+                self.samples[(WAITING,)] += 1
+                self.total += 1
+
+    def stop(self):
+        # Non-blocking; join() before reading the samples
+        self._stop_event.set()
+
+    @staticmethod
+    def _app_stack(frame):
+        # App frames outermost-first, plus the innermost frame (e.g. sqlite3 / json).
+        # Framework-only stacks (routing, serialization) keep just the leaf.
+        while frame.f_back is not None and frame.f_code.co_filename == THIS_FILE:
+            frame = frame.f_back
+        leaf = frame
+        frames = []
+        while frame is not None:
+            if _is_app_code(frame.f_code.co_filename):
+                frames.append(frame)
+            frame = frame.f_back
+        if not frames or leaf is not frames[0]:
+            frames.insert(0, leaf)
+        return tuple(
+            f"{os.path.basename(f.f_code.co_filename)}:{f.f_code.co_name}:{f.f_lineno}"
+            for f in reversed(frames)
+        )
+
+    def report(self, title: str, duration: float) -> str:
+        lines = [
+            title,
+            f"duration: {duration * 1000:.1f} ms, samples: {self.total}, interval: {self.interval * 1000:.1f} ms",
+            "",
+            "Inclusive samples by function:",
+        ]
+        inclusive: Counter = Counter()
+        for stack, count in self.samples.items():
+            for fn in set(s.rsplit(":", 1)[0] for s in stack):
+                inclusive[fn] += count
+        for fn, count in inclusive.most_common(30):
+            lines.append(f"{count:8d} {100.0 * count / max(self.total, 1):6.1f}%  {fn}")
+        lines += ["", "Hottest stacks:"]
+        for stack, count in self.samples.most_common(20):
+            lines.append(f"{count:8d} {100.0 * count / max(self.total, 1):6.1f}%  " + " > ".join(stack))
+        return "\n".join(lines) + "\n"
+
+
+def _in_profiled_thread(endpoint):
+    # Sync endpoints run in a threadpool worker; tell the sampler which one
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        session = _active_profile.get()
+        if session is None:
+            return endpoint(*args, **kwargs)
+        tid = threading.get_ident()
+        session.worker_threads.add(tid)
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            session.worker_threads.discard(tid)
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        if not asyncio.iscoroutinefunction(endpoint):
+            endpoint = _in_profiled_thread(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _profile_requested(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"x-profile":
+            return value not in (b"", b"0", b"false")
+    qs = scope.get("query_string", b"")
+    if b"profile=" not in qs:
+        return False
+    return parse_qs(qs.decode("latin-1")).get("profile", [""])[0] not in ("", "0", "false")
+
+
+class ProfilingMiddleware:
+    # Opt-in per request via `X-Profile: 1` or `?profile=1`, Operation Managers only.
+    # Requests without the flag pass straight through.
+    def __init__(self, app, is_admin: Callable[[str], bool]):
+        self.app = app
+        self.is_admin = is_admin
+
+    async def _authorized(self, scope) -> bool:
+        scheme, token = get_authorization_scheme_param(Headers(scope=scope).get("authorization"))
+        if scheme.lower() != "bearer" or not token:
+            return False
+        return await run_in_threadpool(self.is_admin, token)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _profile_requested(scope) or not await self._authorized(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        session = ProfileSession()
+        token = _active_profile.set(session)
+        sampler = StackSampler(session, PROFILE_INTERVAL_MS / 1000.0)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            sampler.stop()
+            duration = time.perf_counter() - start
+            _active_profile.reset(token)
+            # Joining the sampler and writing the report both block
+            await run_in_threadpool(_store_report, sampler, profile_id, f"{scope['method']} {scope['path']}", duration)
+
+
+def _store_report(sampler: StackSampler, profile_id: str, title: str, duration: float):
+    sampler.join()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.txt"), "w") as f:
+        f.write(sampler.report(title, duration))
+    logger.info("Profiled %s in %.1f ms (profile %s)", title, duration * 1000, profile_id)
+
+    # Keep only the newest PROFILE_KEEP reports
+    reports = [entry for entry in os.scandir(PROFILE_DIR) if PROFILE_ID_RE.match(entry.name[:-4]) and entry.name.endswith(".txt")]
+    reports.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in reports[PROFILE_KEEP:]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def read_profile(profile_id: str) -> Optional[str]:
+    if not PROFILE_ID_RE.match(profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.txt")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return f.read()
+
+
+# --- Slow-query log ----------------------------------------------------------------
+
+class RouteContextMiddleware:
+    # Remembers the ASGI scope so slow queries can name the route that issued them.
+    # The context var is copied into threadpool workers running sync endpoints.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        token = _current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_scope.reset(token)
+
+
+def _current_route() -> str:
+    scope = _current_scope.get()
+    if scope is None:
+        return "-"
+    # Router stores the matched route on the scope; fall back to the raw path
+    route = scope.get("route")
+    return f"{scope.get('method', '')} {getattr(route, 'path', scope.get('path', ''))}"
+
+
+def _params_shape(parameters, executemany: bool) -> str:
+    # Shape only; values may contain passwords or other user data
+    if executemany:
+        return f"{len(parameters)} x {_params_shape(parameters[0], False) if parameters else '()'}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(sorted(parameters)) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return f"({len(parameters)} params)"
+    return type(parameters).__name__
+
+
+_slow_query_threshold = 0.0
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, which is discarded with the statement even
+    # when it raises (after_cursor_execute doesn't run then)
+    context._query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context._query_start_time
+    if duration >= _slow_query_threshold:
+        slow_query_logger.warning(
+            "Slow query %.1f ms [%s] params=%s: %s",
+            duration * 1000,
+            _current_route(),
+            _params_shape(parameters, executemany),
+            " ".join(statement.split()),
+        )
+
+
+def install_slow_query_log(engine, threshold_ms: float):
+    global _slow_query_threshold
+    _slow_query_threshold = threshold_ms / 1000.0
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def install(app, engine, is_admin: Callable[[str], bool]):
+    # Must run before routes are declared so they pick up ProfiledRoute.
+    # is_admin takes a bearer token and runs in the threadpool.
+    app.router.route_class = ProfiledRoute
+    app.add_middleware(ProfilingMiddleware, is_admin=is_admin)
+    # Nothing is registered unless the slow-query log is switched on
+    if SLOW_QUERY_MS:
+        install_slow_query_log(engine, float(SLOW_QUERY_MS))
+        app.add_middleware(RouteContextMiddleware)
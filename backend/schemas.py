@@ -77,3 +77,7 @@ class UsedPart(UsedPartBase):
     id: int
     class Config:
         orm_mode = True
+
+class WorkOrderHistory(WorkOrder):
+    archived: bool = False
+    used_parts: List[UsedPart] = []
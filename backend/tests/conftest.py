@@ -0,0 +1,38 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# Backend modules are imported flat (`import models`), as uvicorn runs them
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Set before any test module imports database/profiling, which read these at import
+SCRATCH_DIR = tempfile.mkdtemp(prefix="fleet-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(SCRATCH_DIR, 'transitland.db')}"
+os.environ["PROFILE_DIR"] = os.path.join(SCRATCH_DIR, "profiles")
+os.environ.pop("SLOW_QUERY_MS", None)
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    import main
+    from models import User, Bus, WorkOrder, Role, Garage, BusLocation, Severity, WorkOrderStatus
+
+    db = main.SessionLocal()
+    db.add_all([
+        User(email="mike@transitland.com", password="mike", role=Role.OPERATION_MANAGER),
+        User(email="jeff@transitland.com", password="jeff", role=Role.MAINTENANCE, assigned_garage=Garage.NORTH),
+        Bus(id="TL-1", model="Gillig", location=BusLocation.NORTH_GARAGE, mileage=1000),
+        Bus(id="TL-2", model="New Flyer", location=BusLocation.SOUTH_GARAGE, mileage=9000, due_for_pm=True),
+        WorkOrder(bus_id="TL-1", description="Brakes", severity=Severity.SEV1, reported_by="jeff"),
+        WorkOrder(bus_id="TL-1", description="Mirror", severity=Severity.SEV3, status=WorkOrderStatus.FIXED),
+        # PM work orders have no severity
+        WorkOrder(bus_id="TL-2", description="Periodic Preventive Maintenance", is_pm=True, reported_by="System"),
+    ])
+    db.commit()
+    db.close()
+    return TestClient(main.app)
+
+def auth(email):
+    return {"Authorization": f"Bearer {email}"}
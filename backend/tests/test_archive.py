@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+import archive
+from database import Base
+from models import (
+    ArchivedUsedPart, ArchivedWorkOrder, Bus, BusLocation, Garage, Inventory,
+    Severity, UsedPart, WorkOrder, WorkOrderStatus,
+)
+
+NOW = datetime.utcnow()
+OLD = NOW - timedelta(days=200)
+RECENT = NOW - timedelta(days=5)
+
+def in_memory_engine():
+    return create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+@pytest.fixture
+def db():
+    engine = in_memory_engine()
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+def work_order(status, date, fixed_at=None):
+    return WorkOrder(
+        bus_id="B1", status=status, date=date, fixed_at=fixed_at,
+        severity=Severity.SEV2, description="check", reported_by="check",
+    )
+
+@pytest.fixture
+def fleet(db):
+    db.add(Bus(id="B1", location=BusLocation.NORTH_GARAGE, model="check"))
+    inv = Inventory(item_name="Filter", quantity=10, garage=Garage.NORTH)
+    db.add(inv)
+    wos = {
+        # Five old fixed work orders, so batch_size=2 needs three batches
+        "old_fixed": [work_order(WorkOrderStatus.FIXED, OLD, fixed_at=OLD) for _ in range(5)],
+        # fixed_at missing: falls back to the report date
+        "legacy_old": work_order(WorkOrderStatus.FIXED, OLD),
+        "legacy_recent": work_order(WorkOrderStatus.FIXED, RECENT),
+        # Reported long ago but only fixed recently: stays live
+        "fixed_recently": work_order(WorkOrderStatus.FIXED, OLD, fixed_at=RECENT),
+        "still_open": work_order(WorkOrderStatus.OPEN, OLD),
+    }
+    db.add_all(wos["old_fixed"] + [wos[k] for k in ("legacy_old", "legacy_recent", "fixed_recently", "still_open")])
+    db.flush()
+    db.add_all([
+        UsedPart(inventory_id=inv.id, work_order_id=wos["old_fixed"][0].id, quantity_used=2),
+        UsedPart(inventory_id=inv.id, work_order_id=wos["old_fixed"][0].id, quantity_used=1),
+        UsedPart(inventory_id=inv.id, work_order_id=wos["fixed_recently"].id, quantity_used=3),
+    ])
+    db.commit()
+    return wos
+
+def test_archives_in_batches_with_cutoff_fallback(db, fleet):
+    commits = []
+    event.listen(db, "after_commit", lambda session: commits.append(1))
+
+    assert archive.archive_fixed_work_orders(db, older_than_days=90, batch_size=2) == 6
+    assert len(commits) == 3
+
+    archived = {wo.id for wo in fleet["old_fixed"]} | {fleet["legacy_old"].id}
+    live = {fleet[k].id for k in ("legacy_recent", "fixed_recently", "still_open")}
+    assert {wo.id for wo in db.query(WorkOrder)} == live
+    assert {wo.id for wo in db.query(ArchivedWorkOrder)} == archived
+
+    # A second run finds nothing left to move
+    assert archive.archive_fixed_work_orders(db, older_than_days=90, batch_size=2) == 0
+
+def test_used_parts_move_with_their_work_order(db, fleet):
+    archive.archive_fixed_work_orders(db, older_than_days=90)
+    archived_parts = db.query(ArchivedUsedPart).all()
+    assert sorted(p.quantity_used for p in archived_parts) == [1, 2]
+    assert {p.work_order_id for p in archived_parts} == {fleet["old_fixed"][0].id}
+    assert [p.work_order_id for p in db.query(UsedPart)] == [fleet["fixed_recently"].id]
+    assert len(archive.used_parts_history(db, fleet["old_fixed"][0].id)) == 2
+
+def test_archived_ids_are_not_reused(db, fleet):
+    max_id = max(wo.id for wo in db.query(WorkOrder))
+    archive.archive_fixed_work_orders(db, older_than_days=90)
+    new_wo = work_order(WorkOrderStatus.OPEN, NOW)
+    db.add(new_wo)
+    db.commit()
+    assert new_wo.id > max_id
+
+def test_history_unions_live_and_archived(db, fleet):
+    archive.archive_fixed_work_orders(db, older_than_days=90)
+    history = archive.work_order_history(db, "B1")
+    assert len(history) == 9
+    assert [h["date"] for h in history] == sorted((h["date"] for h in history), reverse=True)
+    first = next(h for h in history if h["id"] == fleet["old_fixed"][0].id)
+    assert first["archived"] and len(first["used_parts"]) == 2
+    page = archive.work_order_history(db, "B1", skip=2, limit=3)
+    assert [h["id"] for h in page] == [h["id"] for h in history[2:5]]
+
+def test_refuses_to_archive_without_autoincrement():
+    engine = in_memory_engine()
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE used_parts")
+        conn.exec_driver_sql("CREATE TABLE used_parts (id INTEGER PRIMARY KEY, inventory_id INTEGER, work_order_id INTEGER, quantity_used INTEGER)")
+    db = sessionmaker(bind=engine)()
+    with pytest.raises(RuntimeError, match="AUTOINCREMENT"):
+        archive.archive_fixed_work_orders(db)
+
+def test_upgrade_schema_adds_column_and_indexes():
+    engine = in_memory_engine()
+    with engine.begin() as conn:
+        # work_orders as created before archiving existed
+        conn.exec_driver_sql(
+            "CREATE TABLE work_orders (id INTEGER PRIMARY KEY, bus_id VARCHAR, date DATETIME, reported_by VARCHAR,"
+            " severity VARCHAR(4), description VARCHAR, status VARCHAR(5), is_pm BOOLEAN)"
+        )
+    archive.upgrade_schema(engine)
+    archive.upgrade_schema(engine)  # idempotent
+
+    inspector = inspect(engine)
+    assert "fixed_at" in {c["name"] for c in inspector.get_columns("work_orders")}
+    indexes = {tuple(ix["column_names"]) for ix in inspector.get_indexes("work_orders")}
+    assert {("bus_id",), ("status",)} <= indexes
+
+def test_upgrade_schema_matches_create_all_index_names():
+    engine = in_memory_engine()
+    Base.metadata.create_all(bind=engine)
+    archive.upgrade_schema(engine)
+    columns = [tuple(ix["column_names"]) for ix in inspect(engine).get_indexes("work_orders")]
+    assert columns.count(("bus_id",)) == 1 and columns.count(("status",)) == 1
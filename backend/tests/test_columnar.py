@@ -0,0 +1,53 @@
+import pytest
+from columnar import COLUMNAR_MEDIA_TYPE
+
+def decode(payload):
+    # Mirrors decodeColumnar in frontend/src/api.ts
+    rows = []
+    for i in range(payload["count"]):
+        row = {}
+        for field, values in payload["columns"].items():
+            value = values[i]
+            lookup = payload["dictionaries"].get(field)
+            row[field] = lookup[value] if lookup is not None and value is not None else value
+        rows.append(row)
+    return rows
+
+def is_columnar(response):
+    return response.headers["content-type"].startswith(COLUMNAR_MEDIA_TYPE)
+
+@pytest.mark.parametrize("accept, columnar", [
+    (None, False),
+    ("*/*", False),
+    (COLUMNAR_MEDIA_TYPE, True),
+    (f"{COLUMNAR_MEDIA_TYPE}, */*;q=0.1", True),
+    (f"application/json, {COLUMNAR_MEDIA_TYPE};q=0.5", False),
+    (f"{COLUMNAR_MEDIA_TYPE};q=0", False),
+    (f"{COLUMNAR_MEDIA_TYPE};q=0, application/json;q=0.1", False),
+])
+def test_accept_negotiation(client, accept, columnar):
+    headers = {"Accept": accept} if accept else {}
+    for path in ("/buses", "/work-orders"):
+        response = client.get(path, headers=headers)
+        assert response.status_code == 200
+        assert is_columnar(response) is columnar
+        assert "Accept" in response.headers["vary"]
+
+def test_format_overrides_accept(client):
+    assert not is_columnar(client.get("/buses?format=json", headers={"Accept": COLUMNAR_MEDIA_TYPE}))
+    assert is_columnar(client.get("/buses?format=columnar", headers={"Accept": "application/json"}))
+
+def test_unknown_format_rejected(client):
+    assert client.get("/buses?format=arrow").status_code == 422
+    assert client.get("/work-orders?format=msgpack").status_code == 422
+
+def test_buses_round_trip(client):
+    rows = client.get("/buses").json()
+    assert decode(client.get("/buses?format=columnar").json()) == rows
+    assert {row["status"] for row in rows} == {"Critical", "Ready"}
+
+def test_work_orders_round_trip_null_severity(client):
+    rows = client.get("/work-orders").json()
+    payload = client.get("/work-orders?format=columnar").json()
+    assert None in payload["columns"]["severity"]
+    assert decode(payload) == rows
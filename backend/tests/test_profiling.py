@@ -0,0 +1,84 @@
+import logging
+import os
+import pytest
+from sqlalchemy import create_engine, event, exc, text
+import profiling
+from conftest import auth
+
+ADMIN = auth("mike@transitland.com")
+MAINTENANCE = auth("jeff@transitland.com")
+
+def profile(client, headers, path="/buses"):
+    response = client.get(path, headers={**headers, "X-Profile": "1"})
+    assert response.status_code == 200
+    return response.headers.get("x-profile-id")
+
+def test_flag_ignored_without_admin(client):
+    assert profile(client, MAINTENANCE) is None
+    assert profile(client, auth("nobody@transitland.com")) is None
+    assert profile(client, {}) is None
+
+def test_admin_gets_readable_report(client):
+    profile_id = profile(client, ADMIN)
+    assert profiling.PROFILE_ID_RE.match(profile_id)
+
+    response = client.get(f"/admin/profiles/{profile_id}", headers=ADMIN)
+    assert response.status_code == 200
+    assert response.text.startswith("GET /buses\n")
+    assert "samples:" in response.text
+    # Middleware and route wrappers are not part of the report
+    assert "profiling.py" not in response.text
+
+    assert client.get(f"/admin/profiles/{profile_id}", headers=MAINTENANCE).status_code == 403
+
+def test_query_flag(client):
+    response = client.get("/buses?profile=1", headers=ADMIN)
+    assert response.headers.get("x-profile-id")
+
+@pytest.mark.parametrize("profile_id", ["../transitland", "..%2Fconftest", "ABCDEF" * 6, "0" * 31, ""])
+def test_read_profile_rejects_bad_ids(profile_id):
+    assert profiling.read_profile(profile_id) is None
+
+def test_unknown_profile_is_404(client):
+    assert client.get(f"/admin/profiles/{'0' * 32}", headers=ADMIN).status_code == 404
+    assert client.get("/admin/profiles/..%2F..%2Fseed", headers=ADMIN).status_code == 404
+
+def test_reports_are_capped(client, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_KEEP", 2)
+    ids = [profile(client, ADMIN) for _ in range(4)]
+    assert len(os.listdir(profiling.PROFILE_DIR)) == 2
+    assert profiling.read_profile(ids[-1]) is not None
+    assert profiling.read_profile(ids[0]) is None
+
+def test_slow_query_log_off_by_default(client):
+    import main
+    assert not event.contains(main.engine, "before_cursor_execute", profiling._before_cursor_execute)
+    assert not event.contains(main.engine, "after_cursor_execute", profiling._after_cursor_execute)
+    assert all(m.cls is not profiling.RouteContextMiddleware for m in main.app.user_middleware)
+
+@pytest.fixture
+def logged_engine():
+    engine = create_engine("sqlite://")
+    profiling.install_slow_query_log(engine, 0)
+    yield engine
+    event.remove(engine, "before_cursor_execute", profiling._before_cursor_execute)
+    event.remove(engine, "after_cursor_execute", profiling._after_cursor_execute)
+
+def test_slow_query_log_records_shape_not_values(logged_engine, caplog):
+    with caplog.at_level(logging.WARNING, logger="fleet.slow_query"):
+        with logged_engine.connect() as conn:
+            conn.execute(text("SELECT :secret"), {"secret": "hunter2"})
+    (record,) = caplog.records
+    assert "params=(1 params)" in record.getMessage()
+    assert "hunter2" not in record.getMessage()
+
+def test_failed_statements_leave_nothing_on_the_connection(logged_engine, caplog):
+    with logged_engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(exc.OperationalError):
+                conn.execute(text("SELECT * FROM nope"))
+            conn.rollback()
+        with caplog.at_level(logging.WARNING, logger="fleet.slow_query"):
+            conn.execute(text("SELECT 1"))
+        assert "query_start_time" not in conn.info
+    assert len(caplog.records) == 1
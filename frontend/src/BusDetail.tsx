@@ -22,12 +22,15 @@ function StatusBadge({ status }: { status: string }) {
 }
 
 function WorkOrderCard({ wo, onFix, user, inventory, onAdded }: { wo: WorkOrder; onFix: (id: number) => void; user: any; inventory: InventoryItem[]; onAdded: () => void }) {
-    const [usedParts, setUsedParts] = useState<UsedPart[]>([]);
+    const [fetchedParts, setFetchedParts] = useState<UsedPart[]>([]);
     const [showAddModal, setShowAddModal] = useState(false);
+    // History responses carry used parts inline; only fetch when they're missing
+    const usedParts = wo.used_parts ?? fetchedParts;
 
     useEffect(() => {
-        workOrderApi.listUsedParts(wo.id).then(setUsedParts).catch(console.error);
-    }, [wo.id]);
+        if (wo.used_parts) return;
+        workOrderApi.listUsedParts(wo.id).then(setFetchedParts).catch(console.error);
+    }, [wo.id, wo.used_parts]);
 
     
 
@@ -96,8 +99,10 @@ function WorkOrderCard({ wo, onFix, user, inventory, onAdded }: { wo: WorkOrder;
                             inventory={inventory}
                             onClose={() => setShowAddModal(false)}
                             onAdded={async () => {
-                                const parts = await workOrderApi.listUsedParts(wo.id);
-                                setUsedParts(parts);
+                                // Inline parts are refreshed by the parent reload
+                                if (!wo.used_parts) {
+                                    setFetchedParts(await workOrderApi.listUsedParts(wo.id));
+                                }
                                 onAdded();
                             }}
                         />
@@ -263,13 +268,11 @@ export default function BusDetail() {
         if (!id) return;
         const [busData, woData, invData] = await Promise.all([
             busApi.getOne(id),
-            workOrderApi.getAll(),
+            workOrderApi.getForBus(id),
             inventoryApi.getAll(),
         ]);
         setBus(busData);
-        setWorkOrders(woData.filter((wo: WorkOrder) => wo.bus_id === id).sort((a: WorkOrder, b: WorkOrder) =>
-            new Date(b.date).getTime() - new Date(a.date).getTime()
-        ));
+        setWorkOrders(woData);
         setInventory(invData);
         setLoading(false);
     };
@@ -41,6 +41,9 @@ export interface WorkOrder {
     description: string;
     status: 'Open' | 'Fixed';
     is_pm: boolean;
+    // Only set by the bus history endpoint
+    archived?: boolean;
+    used_parts?: UsedPart[];
 }
 
 export interface InventoryItem {
@@ -58,6 +61,30 @@ export interface UsedPart {
     quantity_used: number;
 }
 
+// Columnar wire format: one array per field, enum fields as indexes into `dictionaries`
+export const COLUMNAR_MEDIA_TYPE = 'application/vnd.fleet.columnar+json';
+
+export interface ColumnarPayload {
+    count: number;
+    columns: Record<string, unknown[]>;
+    dictionaries: Record<string, string[]>;
+}
+
+export function decodeColumnar<T>(payload: ColumnarPayload): T[] {
+    const fields = Object.keys(payload.columns);
+    const rows: T[] = [];
+    for (let i = 0; i < payload.count; i++) {
+        const row: Record<string, unknown> = {};
+        for (const field of fields) {
+            const value = payload.columns[field][i];
+            const dict = payload.dictionaries[field];
+            row[field] = dict && value !== null ? dict[value as number] : value;
+        }
+        rows.push(row as T);
+    }
+    return rows;
+}
+
 export const authApi = {
     login: async (email: string, password: string) => {
         const formData = new FormData();
@@ -75,8 +102,11 @@ export const authApi = {
 export const busApi = {
     getAll: async (garage?: string) => {
         const params = garage ? { garage } : {};
-        const response = await api.get<Bus[]>('/buses', { params });
-        return response.data;
+        const response = await api.get<ColumnarPayload>('/buses', {
+            params,
+            headers: { Accept: COLUMNAR_MEDIA_TYPE },
+        });
+        return decodeColumnar<Bus>(response.data);
     },
     getOne: async (id: string) => {
         const response = await api.get<Bus>(`/buses/${id}`);
@@ -86,7 +116,14 @@ export const busApi = {
 
 export const workOrderApi = {
     getAll: async () => {
-        const response = await api.get<WorkOrder[]>('/work-orders');
+        const response = await api.get<ColumnarPayload>('/work-orders', {
+            headers: { Accept: COLUMNAR_MEDIA_TYPE },
+        });
+        return decodeColumnar<WorkOrder>(response.data);
+    },
+    // Full history for one bus, including archived work orders (newest first)
+    getForBus: async (busId: string, params?: { skip?: number; limit?: number }) => {
+        const response = await api.get<WorkOrder[]>(`/buses/${busId}/work-orders`, { params });
         return response.data;
     },
     create: async (data: { bus_id: string; description: string; severity?: string | null; reported_by: string; is_pm?: boolean }) => {